@@ -0,0 +1,205 @@
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from tagutil import crop_thumbnail
+
+# Headless batch version of EasyMP3: downloads every link in a text file and
+# square-crops the embedded thumbnails, without starting the Tk GUI.
+
+# Max concurrent downloads
+MAX_WORKERS = 10
+
+# Whether we run as a PyInstaller bundle never changes — check once
+_IS_FROZEN = getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS')
+
+def get_base_path():
+    """Gets the base path for bundled resources (project root for script, temp dir for frozen exe)."""
+    if _IS_FROZEN:
+        # Running as a bundled executable
+        return Path(sys._MEIPASS)
+    else:
+        # Running as a script
+        return Path(__file__).parent.parent # Project root
+
+BASE_PATH = get_base_path()
+BIN_DIR = BASE_PATH / "bin"
+YTDLP_PATH = BIN_DIR / "yt-dlp.exe"
+FFMPEG_PATH = BIN_DIR / "ffmpeg.exe"
+
+# Computed once instead of on every subprocess spawn
+CREATE_FLAGS = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+YTDLP_STR = str(YTDLP_PATH)
+
+# Keeping close_fds off on POSIX lets Popen take the posix_spawn fast path
+# (no fork + page-table copy of the whole interpreter); on Windows the default
+# must stay so redirected handles behave. No call site sets preexec_fn, cwd,
+# or env, which would also force the slow fork path.
+CLOSE_FDS = sys.platform == "win32"
+
+# Pre-built STARTUPINFO hiding the child's window at CreateProcess time, so
+# the OS never sets up console window state it would immediately tear down
+if sys.platform == "win32":
+    _STARTUPINFO = subprocess.STARTUPINFO()
+    _STARTUPINFO.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+else:
+    _STARTUPINFO = None
+
+# The shared tag helpers in tagutil report through `logging`; mirror their
+# messages to stdout so per-file crop results stay visible like before
+logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+
+# Serialize console output from worker threads so lines don't interleave
+print_lock = threading.Lock()
+
+def log(message):
+    with print_lock:
+        print(message)
+
+def check_dependencies():
+    """Checks if yt-dlp and ffmpeg executables exist."""
+    if not YTDLP_PATH.is_file():
+        log(f"Error: yt-dlp.exe not found in expected location: {BIN_DIR}")
+        return False
+    if not FFMPEG_PATH.is_file():
+        log(f"Error: ffmpeg.exe not found in expected location: {BIN_DIR}")
+        return False
+    return True
+
+def _download_slice(urls, output_dir):
+    """Downloads one slice of URLs with a single yt-dlp process."""
+    # Relative template: --paths home decides the destination directory
+    output_template = "%(channel)s - %(title)s.%(ext)s"
+
+    command = [
+        YTDLP_STR,
+        "-f", "bestaudio/best",
+        "--no-playlist",
+        "--extract-audio",
+        "--audio-format", "mp3",
+        "--audio-quality", "0",
+        "--embed-thumbnail",
+        "--add-metadata",
+        "--output", output_template,
+        "--force-overwrite", # Overwrite existing files
+        "--no-progress",
+        "--paths", f"home:{output_dir}",
+        "--paths", f"temp:{tempfile.gettempdir()}", # Keep partial files out of the user's folder
+        "--ignore-errors", # Keep going when one URL in the slice fails
+        "-N", "4", # Concurrent fragments within each download
+    ] + urls
+
+    # Stream output instead of capture_output=True: for long link lists the
+    # full log would otherwise be buffered in memory, and the user would see
+    # nothing until the whole batch finished.
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, encoding='utf-8', errors='replace', bufsize=1,
+                            stdin=subprocess.DEVNULL, # No console attaches to feed it anyway
+                            creationflags=CREATE_FLAGS, close_fds=CLOSE_FDS,
+                            startupinfo=_STARTUPINFO)
+    last_lines = deque(maxlen=20) # Keep a short tail for error reporting
+    for line in proc.stdout:
+        line = line.rstrip()
+        if line:
+            log(line)
+            last_lines.append(line)
+    proc.stdout.close()
+    if proc.wait() != 0:
+        log(f"yt-dlp finished with errors (Code: {proc.returncode}). Output tail:")
+        for line in last_lines:
+            log(f"  {line}")
+        return False
+    return True
+
+def download_batch(links_file, output_dir, threads):
+    """Downloads every link in links_file across up to `threads` yt-dlp processes."""
+    try:
+        with open(links_file, 'r', encoding='utf-8') as f:
+            links = [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    except OSError as e:
+        log(f"Error: could not read {links_file}: {e}")
+        return False
+    if not links:
+        log(f"No links found in {links_file}")
+        return True
+
+    # A single process would walk the list strictly sequentially (yt-dlp has
+    # no cross-URL concurrency; -N only parallelizes fragments within one
+    # download). Split the list across up to `threads` processes instead:
+    # each slice still amortizes one process start over several URLs, and the
+    # slices download concurrently.
+    num_procs = min(threads, len(links))
+    slices = [links[i::num_procs] for i in range(num_procs)]
+
+    if num_procs == 1:
+        return _download_slice(slices[0], output_dir)
+    with ThreadPoolExecutor(max_workers=num_procs) as executor:
+        results = list(executor.map(lambda urls: _download_slice(urls, output_dir), slices))
+    if not all(results):
+        log(f"{results.count(False)} of {num_procs} download slice(s) finished with errors.")
+        return False
+    log(f"Batch download complete for {links_file}")
+    return True
+
+def find_mp3_files(root_dir, exclude_dirs):
+    """Yields paths of all MP3s under root_dir, pruning excluded directories whole."""
+    # os.scandir reuses the stat info from the directory read and lets us skip
+    # excluded subtrees at the recursion boundary instead of filtering per file.
+    with os.scandir(root_dir) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in exclude_dirs:
+                    yield from find_mp3_files(entry.path, exclude_dirs)
+            elif entry.name.endswith('.mp3'):
+                yield Path(entry.path)
+
+def main():
+    parser = argparse.ArgumentParser(description="EasyMP3 batch downloader (no GUI).")
+    parser.add_argument("links_file", nargs="?", help="Text file with one YouTube URL per line")
+    parser.add_argument("-o", "--output", default=".", help="Output directory for MP3 files")
+    parser.add_argument("-t", "--threads", type=int, default=MAX_WORKERS, help="Concurrent downloads")
+    parser.add_argument("--crop-threads", type=int, default=min(os.cpu_count() or 4, 4),
+                        help="Concurrent thumbnail crops (crop is more CPU-bound than download)")
+    parser.add_argument("--exclude", default="", help="Comma-separated directory names to skip during cropping")
+    parser.add_argument("--skip-download", action="store_true", help="Only crop thumbnails of existing MP3s")
+    args = parser.parse_args()
+
+    # Bad but parseable values like -t 0 would otherwise crash
+    # ThreadPoolExecutor with "max_workers must be greater than 0"
+    args.threads = max(1, args.threads)
+    args.crop_threads = max(1, args.crop_threads)
+
+    if not check_dependencies():
+        sys.exit(1)
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if not args.skip_download:
+        if not args.links_file:
+            parser.error("links_file is required unless --skip-download is given")
+        if not download_batch(args.links_file, output_dir, args.threads):
+            sys.exit(1) # Scripts need a real exit code when downloads fail
+
+    # Crop phase: the crop runs in-process, but Pillow releases the GIL during
+    # decode/encode so a small thread pool still overlaps the CPU work.
+    # Immutable and hashed once; the walk does one C-level membership test
+    # per directory name against it
+    exclude_dirs = frozenset(ex.strip() for ex in args.exclude.split(',') if ex.strip())
+    files_to_process = list(find_mp3_files(output_dir, exclude_dirs))
+
+    log(f"Cropping thumbnails for {len(files_to_process)} file(s)...")
+    with ThreadPoolExecutor(max_workers=args.crop_threads) as executor:
+        crop_results = list(executor.map(crop_thumbnail, files_to_process))
+    if not all(crop_results):
+        log(f"{crop_results.count(False)} of {len(crop_results)} crop(s) failed.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,53 @@
+import logging
 import os
 import subprocess
 import sys
+import tempfile
 import threading
 import tkinter as tk
 import queue
 import re
 from tkinter import filedialog, messagebox, ttk
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import shutil
-import uuid
 import time
 import pyperclip
 import sv_ttk
+from tagutil import crop_thumbnail
 
 # Max concurrent downloads
 MAX_WORKERS = 10
 
+# How many queued URLs to hand to one yt-dlp process
+BATCH_SIZE = 4
+
+# Simple regex for YouTube URLs, anchored so trailing garbage after the video
+# id fails validation; group 1 is the 11-char video id
+YOUTUBE_URL_RE = re.compile(r"^(?:https?://)?(?:www\.)?(?:youtube\.com/watch\?v=|youtu\.be/)([a-zA-Z0-9_-]{11})(?:[&?#]|$)")
+
+# Matches the lines our --progress-template emits: "<video id> <percent>%"
+_PCT_RE = re.compile(r"^([a-zA-Z0-9_-]{11}) +(\d+\.\d+)%")
+
+# Longest string shown in a URL/Filename cell before truncation
+_CELL_DISPLAY_MAX = 60
+
+# Verbose console output is opt-in: with the level at WARNING the debug calls
+# below return before formatting their arguments, so the hot paths pay neither
+# string building nor the stdio lock. EASYMP3_DEBUG=1 turns the firehose on.
+DEBUG = os.environ.get("EASYMP3_DEBUG") == "1"
+logging.basicConfig(level=logging.DEBUG if DEBUG else logging.WARNING,
+                    format="%(levelname)s %(name)s: %(message)s")
+log = logging.getLogger("easymp3")
+
 ICON_NAME = "icon.ico" # Define icon filename
 
+# Whether we run as a PyInstaller bundle never changes — check once
+_IS_FROZEN = getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS')
+
 def get_base_path():
     """Gets the base path for bundled resources (project root for script, temp dir for frozen exe)."""
-    if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
+    if _IS_FROZEN:
         # Running as a bundled executable
         return Path(sys._MEIPASS)
     else:
@@ -30,7 +56,7 @@ def get_base_path():
 
 def get_run_directory():
     """Gets the directory where the script/exe is running."""
-    if getattr(sys, 'frozen', False):
+    if _IS_FROZEN:
         return Path(sys.executable).parent
     else:
         return Path(__file__).parent.parent
@@ -40,8 +66,26 @@ BIN_DIR = BASE_PATH / "bin"
 YTDLP_PATH = BIN_DIR / "yt-dlp.exe"
 FFMPEG_PATH = BIN_DIR / "ffmpeg.exe"
 
+# Computed once instead of on every subprocess spawn
+CREATE_FLAGS = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+YTDLP_STR = str(YTDLP_PATH)
+
+# Keeping close_fds off on POSIX lets Popen take the posix_spawn fast path
+# (no fork + page-table copy of the whole interpreter); on Windows the default
+# must stay so redirected handles behave. No call site sets preexec_fn, cwd,
+# or env, which would also force the slow fork path.
+CLOSE_FDS = sys.platform == "win32"
+
+# Pre-built STARTUPINFO hiding the child's window at CreateProcess time, so
+# the OS never sets up console window state it would immediately tear down
+if sys.platform == "win32":
+    _STARTUPINFO = subprocess.STARTUPINFO()
+    _STARTUPINFO.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+else:
+    _STARTUPINFO = None
+
 # --- Determine Assets Path Correctly ---
-if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
+if _IS_FROZEN:
     # Frozen executable: Assets are relative to BASE_PATH (_MEIPASS)
     # based on `--add-data "src/assets;assets"` -> destination is "assets"
     ASSETS_DIR = BASE_PATH / "assets"
@@ -65,264 +109,182 @@ def check_dependencies():
 
 # --- Helper to update Treeview safely from other threads ---
 def schedule_gui_update(app, item_id, column, value):
-    """Safely schedule a GUI update from a worker thread."""
+    """Safely queue a GUI update from a worker thread (coalesced on the Tk side)."""
     # Truncate long URLs/filenames for display if necessary
-    if (column == "URL" or column == "Filename") and len(value) > 60:
-        value = value[:57] + "..."
-    # Call the correct update function name
-    app.root.after_idle(app.update_task_display, item_id, column, value)
-
-# --- Reverted download_audio logic ---
-def download_audio(task_id, link, output_dir, status_callback, app):
-    """Downloads audio, extracts MP3, and embeds thumbnail using original command."""
-    schedule_gui_update(app, task_id, "Status", "Downloading...")
-
-    # Create a temporary subdirectory within the *output* directory
-    temp_download_subdir = Path(output_dir) / f"_temp_dl_{os.urandom(4).hex()}"
+    if column != "Status" and isinstance(value, str) and len(value) > _CELL_DISPLAY_MAX:
+        value = f"{value[:_CELL_DISPLAY_MAX - 3]}..."
+    # Last-writer-wins per cell: rapid status transitions collapse into
+    # whatever value is current when the flush fires, instead of one
+    # after_idle callback (and Treeview redraw) per transition
+    with app._updates_lock:
+        app._pending_updates[(item_id, column)] = value
+        if not app._flush_scheduled:
+            app._flush_scheduled = True
+            app.root.after(30, app._flush_updates)
+
+# --- Batched download logic ---
+def download_audio(tasks, output_dir, status_callback, app):
+    """Downloads a batch of links with one yt-dlp process.
+
+    tasks is a list of (item_id, url) pairs; returns a dict mapping item_id to
+    the downloaded Path for every task that produced a file."""
+    for item_id, _url in tasks:
+        schedule_gui_update(app, item_id, "Status", "Downloading...")
+
+    # Map video ids to Treeview items so the --print output can be correlated
+    # back to the right row
+    id_to_item = {}
+    for item_id, url in tasks:
+        match = YOUTUBE_URL_RE.match(url.strip())
+        if match:
+            id_to_item[match.group(1)] = item_id
+
+    # yt-dlp writes straight into the output directory and tells us the exact
+    # final path of each file via --print, so there is no temp subdir to
+    # create, glob, or rename out of afterwards. The template must stay
+    # relative for --paths to take effect.
+    output_template = "%(channel)s - %(title)s.%(ext)s" # Restored channel name
+
+    command = [
+        YTDLP_STR,
+        "-f", "bestaudio/best",
+        "--no-playlist",
+        "--extract-audio",
+        "--audio-format", "mp3",
+        "--audio-quality", "0",
+        "--embed-thumbnail",
+        "--convert-thumbnails", "jpg",
+        # Crop to square inside yt-dlp's own thumbnail convert pass, so most
+        # files need no post-processing from us at all
+        "--postprocessor-args", "ThumbnailsConvertor:-vf crop=ih:ih",
+        "--add-metadata",
+        "--output", output_template,
+        "--force-overwrite", # Overwrite existing files
+        "--newline", # One progress line per update instead of \r rewrites
+        "--progress-template", "download:%(info.id)s %(progress._percent_str)s",
+        "--ignore-errors", # One bad URL must not abort the rest of the batch
+        "--paths", f"home:{output_dir}",
+        "--paths", f"temp:{tempfile.gettempdir()}", # Keep partial files out of the user's folder
+        "--print", "after_move:%(id)s\t%(filepath)s", # Emit "<video id>TAB<path>" per finished file
+        "--no-simulate", # --print alone would imply simulation
+    ] + [url.strip() for _item_id, url in tasks]
+
+    downloaded = {}
     try:
-        temp_download_subdir.mkdir(parents=True, exist_ok=True)
-
-        # Use the original output template structure pointing to the temp subdir
-        output_template = str(temp_download_subdir / "%(channel)s - %(title)s.%(ext)s") # Restored channel name
-
-        command = [
-            str(YTDLP_PATH),
-            "-f", "bestaudio/best",
-            "--no-playlist",
-            "--extract-audio",
-            "--audio-format", "mp3",
-            "--audio-quality", "0",
-            "--embed-thumbnail",
-            "--add-metadata",
-            "--output", output_template, # Output to temp subdir
-            "--force-overwrite", # Overwrite existing files
-            "--no-progress",
-            link.strip()
-        ]
-
-        # schedule_gui_update(app, task_id, "Status", "Running yt-dlp...")
-        # Run yt-dlp, capture output
-        creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
-        result = subprocess.run(command, check=True, capture_output=True, text=True, encoding='utf-8', errors='replace', creationflags=creationflags)
-        # print("yt-dlp stdout:", result.stdout)
-        print("yt-dlp stderr:", result.stderr)
-
-        # Find the downloaded MP3 file (should be only one)
-        downloaded_files = list(temp_download_subdir.glob('*.mp3'))
-        if not downloaded_files:
-            raise FileNotFoundError(f"No MP3 file found in {temp_download_subdir} after download.")
-
-        original_mp3_path = downloaded_files[0]
-        schedule_gui_update(app, task_id, "Filename", original_mp3_path.name)
-
-        # schedule_gui_update(app, task_id, "Status", "Download complete")
-
-        # Move the final MP3 file to the target output directory
-        target_mp3_path = Path(output_dir) / original_mp3_path.name
-        shutil.move(str(original_mp3_path), str(target_mp3_path)) # Use shutil.move
-        print(f"Moved {original_mp3_path.name} to {target_mp3_path}")
-
-        # Return the path to the final MP3 and the temp dir path for cleanup later
-        return target_mp3_path, temp_download_subdir # Modified return value
+        # Stream yt-dlp output line-by-line instead of buffering the whole log:
+        # memory stays O(one line) per process and rows update as each file in
+        # the batch lands.
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                text=True, encoding='utf-8', errors='replace', bufsize=1,
+                                stdin=subprocess.DEVNULL, # No console attaches to feed it anyway
+                                creationflags=CREATE_FLAGS, close_fds=CLOSE_FDS,
+                                startupinfo=_STARTUPINFO)
+        last_lines = deque(maxlen=20) # Keep a short tail for error reporting
+        for line in proc.stdout:
+            line = line.rstrip()
+            if not line:
+                continue
+            pct_match = _PCT_RE.match(line)
+            if pct_match:
+                # Progress tick: show the percentage, keep it out of the tail
+                item_id = id_to_item.get(pct_match.group(1))
+                if item_id:
+                    schedule_gui_update(app, item_id, "Status", f"Downloading {pct_match.group(2)}%")
+                continue
+            last_lines.append(line)
+            video_id, sep, filepath = line.partition("\t")
+            if sep and video_id in id_to_item:
+                mp3_path = Path(filepath)
+                if mp3_path.is_file():
+                    item_id = id_to_item[video_id]
+                    downloaded[item_id] = mp3_path
+                    schedule_gui_update(app, item_id, "Filename", mp3_path.name)
+                    schedule_gui_update(app, item_id, "Status", "Downloaded")
+            elif len(tasks) == 1:
+                # Single-URL batch: stream raw yt-dlp lines into the status cell
+                schedule_gui_update(app, tasks[0][0], "Status", line)
+        proc.stdout.close()
+        returncode = proc.wait()
+        if returncode != 0 and not downloaded:
+            raise subprocess.CalledProcessError(returncode, command, output="\n".join(last_lines))
+
+        for _item_id, mp3_path in downloaded.items():
+            log.debug("Downloaded %s", mp3_path.name)
 
     except subprocess.CalledProcessError as e:
-        error_message = f"yt-dlp failed (Code: {e.returncode}). Check URL? Stderr: {e.stderr[:200]}..."
-        schedule_gui_update(app, task_id, "Status", "Error: Download failed")
-        print(f"Error during download: {e}\nStderr:\n{e.stderr}")
-        # Clean up temp dir on error
-        try:
-            if temp_download_subdir.exists():
-                shutil.rmtree(temp_download_subdir)
-        except Exception as cleanup_error:
-            print(f"Error cleaning up temp directory {temp_download_subdir}: {cleanup_error}")
-        return None, None # Modified return value
-    except FileNotFoundError as e:
-        # This specifically catches the FileNotFoundError raised if original_mp3_path doesn't exist
-        error_message = "MP3 file not found post-download."
-        schedule_gui_update(app, task_id, "Status", "Error: " + error_message)
-        print(f"Error: {e}")
-        # Clean up temp dir on error
-        try:
-            if temp_download_subdir.exists():
-                shutil.rmtree(temp_download_subdir)
-        except Exception as cleanup_error:
-            print(f"Error cleaning up temp directory {temp_download_subdir}: {cleanup_error}")
-        return None, None # Modified return value
+        log.error("yt-dlp failed (Code: %s). Check URL(s)? Output tail:\n%s", e.returncode, e.output)
     except Exception as e:
-        error_message = f"An unexpected error occurred during download: {e}"
-        schedule_gui_update(app, task_id, "Status", "Error: Download failed")
-        print(error_message)
-        # Clean up temp dir on error
-        try:
-            if temp_download_subdir.exists():
-                shutil.rmtree(temp_download_subdir)
-        except Exception as cleanup_error:
-            print(f"Error cleaning up temp directory {temp_download_subdir}: {cleanup_error}")
-        return None, None # Modified return value
+        log.error("An unexpected error occurred during download: %s", e)
 
-# --- Reverted crop_thumbnail logic ---
-def crop_thumbnail(task_id, mp3_file, status_callback, app):
-    """Extracts, crops to square, and re-embeds thumbnail using ffmpeg."""
-    schedule_gui_update(app, task_id, "Status", "Processing...")
-    temp_dir = mp3_file.parent / f"_thumb_proc_{mp3_file.stem}_{os.urandom(4).hex()}"
-    temp_dir.mkdir(exist_ok=True)
+    # Whatever produced no file is an error (bad URL, network, parse, ...)
+    for item_id, _url in tasks:
+        if item_id not in downloaded:
+            schedule_gui_update(app, item_id, "Status", "Error: Download failed")
 
-    temp_image_name = temp_dir / "original_thumb.jpg"
-    cropped_image_name = temp_dir / "cropped_thumb.jpg"
-    final_track_name = temp_dir / mp3_file.name
-
-    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    return downloaded
 
+def _finish_crop(app, item_id, future):
+    """Done-callback for a crop future: emits the final task status."""
     try:
-        # 1. Extract Thumbnail
-        # schedule_gui_update(app, task_id, "Status", "Extracting thumbnail...")
-        cmd_extract = [str(FFMPEG_PATH), "-hide_banner", "-loglevel", "error", "-y", "-i", str(mp3_file), str(temp_image_name)]
-        result_extract = subprocess.run(cmd_extract, check=False, capture_output=True, text=True, encoding='utf-8', errors='replace', creationflags=creationflags) # check=False
-
-        # Check common ffmpeg message for missing art
-        if result_extract.returncode != 0:
-            if "error retrieving cover art" in result_extract.stderr.lower() or "attached picture extraction failed" in result_extract.stderr.lower():
-                schedule_gui_update(app, task_id, "Status", "No thumbnail found")
-                print(f"No thumbnail found in {mp3_file.name}. Skipping crop.")
-                return True # Not an error, just no thumbnail to crop
-            else:
-                schedule_gui_update(app, task_id, "Status", "Error: Extract failed")
-                print(f"ffmpeg error extracting thumbnail from {mp3_file.name}:\n{result_extract.stderr}")
-                return False # Extraction failed
-
-        if not temp_image_name.exists():
-            schedule_gui_update(app, task_id, "Status", "No thumbnail found") # Treat as if not found
-            print(f"Thumbnail file {temp_image_name} not found after extraction attempt for {mp3_file.name}. Skipping crop.")
-            return True # Not an error, just no thumbnail to crop
-
-        # 2. Crop Thumbnail
-        # schedule_gui_update(app, task_id, "Status", "Cropping thumbnail...")
-        cmd_crop = [str(FFMPEG_PATH), "-hide_banner", "-loglevel", "error", "-y", "-i", str(temp_image_name), "-vf", "crop=ih:ih", str(cropped_image_name)]
-        result_crop = subprocess.run(cmd_crop, check=True, capture_output=True, text=True, encoding='utf-8', errors='replace', creationflags=creationflags)
-        # print(f"ffmpeg crop stdout: {result_crop.stdout}")
-        # print(f"ffmpeg crop stderr: {result_crop.stderr}")
-
-        if not cropped_image_name.exists():
-            raise FileNotFoundError("Cropped image file not found after ffmpeg crop operation.")
-
-        # 3. Re-embed Cropped Thumbnail
-        # schedule_gui_update(app, task_id, "Status", "Re-embedding...")
-        cmd_embed = [
-            str(FFMPEG_PATH), "-hide_banner", "-loglevel", "error", "-y",
-            "-i", str(mp3_file), # Input MP3
-            "-i", str(cropped_image_name), # Input Cropped JPG
-            "-map_metadata", "0",
-            "-map_metadata:s:1", "0:s:1", # Map image metadata
-            "-map", "0:a", # Map audio stream
-            "-map", "1",   # Map new image stream
-            "-acodec", "copy",
-            str(final_track_name), # Output MP3 path
-            '-y' # Overwrite output without asking
-        ]
-
-        # Inner try block for the embedding subprocess
-        try:
-            result_embed = subprocess.run(cmd_embed, check=True, capture_output=True, text=True, encoding='utf-8', errors='replace', creationflags=creationflags)
-            # print(f"ffmpeg embed stdout: {result_embed.stdout}")
-            # print(f"ffmpeg embed stderr: {result_embed.stderr}")
-
-            if not final_track_name.exists():
-                raise FileNotFoundError("Final MP3 with re-embedded thumbnail not found.")
-
-            # 4. Replace original MP3 with the new one
-            # schedule_gui_update(app, task_id, "Status", "Finalizing...")
-            os.replace(str(final_track_name), str(mp3_file)) # Use os.replace for atomic move/replace
-            print(f"Successfully processed thumbnail for: {mp3_file.name}")
-            return True # Indicate success
-
-        # Exceptions specifically for the embedding step
-        except subprocess.CalledProcessError as e:
-            error_message = f"ffmpeg error during embed (Code: {e.returncode}) for {mp3_file.name}. Stderr: {e.stderr[:200]}..."
-            schedule_gui_update(app, task_id, "Status", "Error: Embed failed")
-            print(f"{error_message}\nFull stderr:\n{e.stderr}")
-            return False # Indicate failure
-        except FileNotFoundError as e:
-            # This specifically catches the FileNotFoundError raised if final_track_name doesn't exist
-            error_message = f"File not found after embedding: {e}"
-            schedule_gui_update(app, task_id, "Status", "Error: Embed File Missing")
-            print(error_message)
-            return False # Indicate failure
-
-    # Outer except blocks handle errors from extract/crop steps, or unexpected errors
-    except subprocess.CalledProcessError as e:
-        error_message = f"ffmpeg error (Code: {e.returncode}) processing {mp3_file.name}. Stderr: {e.stderr[:200]}..."
-        schedule_gui_update(app, task_id, "Status", "Error: Crop failed")
-        print(f"{error_message}\nFull stderr:\n{e.stderr}")
-        return False # Indicate failure
-    except FileNotFoundError as e:
-        error_message = f"File not found during thumbnail processing: {e}"
-        schedule_gui_update(app, task_id, "Status", "Error: Crop File Missing")
-        print(error_message)
-        return False # Indicate failure
+        crop_result = future.result()
     except Exception as e:
-        error_message = f"Unexpected error processing {mp3_file.name}: {e}"
-        schedule_gui_update(app, task_id, "Status", "Error: Crop failed")
-        print(error_message)
-        import traceback
-        traceback.print_exc() # Print full traceback for unexpected errors
-        return False # Indicate failure
-    finally:
-        # Clean up the temporary directory used for cropping
-        try:
-            if temp_dir.exists():
-                shutil.rmtree(temp_dir)
-                # print(f"Cleaned up thumbnail processing temp dir: {temp_dir}")
-        except Exception as e:
-            print(f"Error cleaning up temp directory {temp_dir}: {e}")
+        log.error("Unexpected error in crop worker: %s", e)
+        crop_result = False
+    if crop_result:
+        # Crop succeeded or was skipped (no thumbnail)
+        schedule_gui_update(app, item_id, "Status", "Completed")
+    else:
+        # Crop failed, but download was okay
+        schedule_gui_update(app, item_id, "Status", "Error: Crop failed")
 
-# --- Reverted process_task logic ---
-def process_task(task_id, url, output_path, app):
-    """Wrapper function to run download and crop for a single task."""
-    print(f"Worker {task_id}: Starting processing for {url} -> {output_path}")
-    app.active_workers += 1
-    mp3_path, temp_dir = None, None # Keep track of download result and temp download dir
+# --- Batched process_task logic ---
+def process_batch(tasks, output_path, app):
+    """Wrapper function to run one batched download and the per-file crops."""
+    log.debug("Worker: starting batch of %d task(s) -> %s", len(tasks), output_path)
 
     try:
-        # Call the reverted download_audio (now expects string path)
-        mp3_path, temp_dir = download_audio(task_id, url, output_path, schedule_gui_update, app)
-
-        if mp3_path: # If download succeeded (mp3_path is the final Path object)
-            # schedule_gui_update(app, task_id, "Status", "Processing thumbnail...")
-            # Call reverted crop_thumbnail
-            crop_result = crop_thumbnail(task_id, mp3_path, schedule_gui_update, app)
-            if crop_result:
-                # Crop succeeded or was skipped (no thumbnail)
-                schedule_gui_update(app, task_id, "Status", "Completed")
-            else:
-                # Crop failed, but download was okay
-                schedule_gui_update(app, task_id, "Status", "Error: Crop failed")
-        # else: Download failed, status already set by download_audio
+        downloaded = download_audio(tasks, output_path, schedule_gui_update, app)
+
+        # Hand the crops to the crop pool and return: this worker frees up for
+        # the next download while the CPU-side work finishes asynchronously
+        for item_id, mp3_path in downloaded.items():
+            schedule_gui_update(app, item_id, "Status", "Processing...")
+            future = app.crop_executor.submit(crop_thumbnail, mp3_path)
+            future.add_done_callback(lambda f, item_id=item_id: _finish_crop(app, item_id, f))
+        # Download failures had their status set by download_audio
 
-        print(f"Worker {task_id}: Task finished for {url}")
+        log.debug("Worker: batch of %d finished", len(tasks))
 
     except Exception as e:
-        print(f"Error in worker thread for task {task_id}: {e}")
+        log.error("Error in worker thread for batch: %s", e)
         import traceback
         traceback.print_exc()
-        try:
-            # Attempt to update GUI with unexpected error status
-            schedule_gui_update(app, task_id, "Status", "Error: Unexpected Worker")
-        except Exception as gui_e:
-            print(f"Error updating GUI from worker exception handler: {gui_e}")
-    finally:
-        # Clean up the temporary *download* directory if it exists
-        if temp_dir and temp_dir.exists():
+        for item_id, _url in tasks:
             try:
-                shutil.rmtree(temp_dir)
-                print(f"Cleaned up download temp directory: {temp_dir}")
-            except Exception as cleanup_error:
-                print(f"Error cleaning up download temp directory {temp_dir}: {cleanup_error}")
+                # Attempt to update GUI with unexpected error status
+                schedule_gui_update(app, item_id, "Status", "Error: Unexpected Worker")
+            except Exception as gui_e:
+                log.error("Error updating GUI from worker exception handler: %s", gui_e)
+    finally:
+        for _item_id, url in tasks:
+            app._queued_urls.discard(url.strip()) # Allow the URL to be re-added
+        # No active_workers here: the property walks task_list, which the Tk
+        # thread mutates, and it would be evaluated even with debug logging off
+
+class Task:
+    """Per-row task record; slotted so thousands of tasks stay cheap."""
+    __slots__ = ("url", "status", "filename")
 
-        app.active_workers -= 1
-        print(f"Worker {task_id}: Worker finished. Active workers: {app.active_workers}")
+    def __init__(self, url):
+        self.url = url
+        self.status = "Queued"
+        self.filename = "-"
 
 # --- Main Application Class --- (UI setup remains the same)
 class EasyMP3App:
+    # Hashed once; membership checks on the update path are O(1)
+    _VALID_COLUMNS = frozenset(("URL", "Filename", "Status"))
+
     def __init__(self, root):
         self.root = root
         self.root.title("EasyMP3")
@@ -332,13 +294,13 @@ class EasyMP3App:
         try:
             if ICON_PATH.is_file():
                 self.root.iconbitmap(default=ICON_PATH)
-                print(f"Attempting to load icon from: {ICON_PATH}")
+                log.debug("Attempting to load icon from: %s", ICON_PATH)
             else:
-                 print(f"Warning: Icon file not found at {ICON_PATH}")
+                 log.warning("Icon file not found at %s", ICON_PATH)
         except tk.TclError as e:
-            print(f"Warning: Could not set window icon ({ICON_PATH}): {e}")
+            log.warning("Could not set window icon (%s): %s", ICON_PATH, e)
         except Exception as e:
-            print(f"Warning: An unexpected error occurred setting icon: {e}")
+            log.warning("An unexpected error occurred setting icon: %s", e)
 
         # Apply the theme
         sv_ttk.set_theme("dark") # Options: "light", "dark"
@@ -346,10 +308,15 @@ class EasyMP3App:
         # --- Variables ---
         self.output_dir = tk.StringVar(value=str(get_base_path()))
         self.task_queue = queue.Queue()
-        self.task_list = {}  # Stores task details {task_id: {url, status, filename}}
-        self.active_workers = 0
-        self.worker_lock = threading.Lock()
-        self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        self.task_list = {}  # Stores task details {item_id: Task}
+        # Small second pool so cropping overlaps the next download instead of
+        # holding a network worker hostage for CPU work. Capped at four: the
+        # crop is CPU-bound, and more lanes than cores just fight for cache
+        self.crop_executor = ThreadPoolExecutor(max_workers=min(os.cpu_count() or 4, 4))
+        self._queued_urls = set()  # URLs currently queued or in flight (de-dup)
+        self._pending_updates = {}  # (item_id, column) -> latest value awaiting flush
+        self._updates_lock = threading.Lock()
+        self._flush_scheduled = False
 
         # --- GUI Setup ---
         self.main_frame = ttk.Frame(root, padding="10")
@@ -410,9 +377,13 @@ class EasyMP3App:
         self.clear_button = ttk.Button(self.buttons_frame, text="Clear Completed", command=self.clear_completed_tasks)
         self.clear_button.grid(row=0, column=1, padx=5, pady=5, sticky="e")
 
-        # --- Start Task Manager Thread ---
-        self.manager_thread = threading.Thread(target=self.task_manager, daemon=True)
-        self.manager_thread.start()
+        # --- Start Worker Threads ---
+        # Long-lived workers blocked on queue.get(): no executor on top, so no
+        # Future/_WorkItem allocation per task and no second scheduling layer
+        self.workers = [threading.Thread(target=self._worker_loop, daemon=True)
+                        for _ in range(MAX_WORKERS)]
+        for worker in self.workers:
+            worker.start()
 
         # --- Handle Window Closing ---
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -421,12 +392,10 @@ class EasyMP3App:
         directory = filedialog.askdirectory()
         if directory: # If a directory was selected
             self.output_dir_var.set(directory) # Update the label's variable
-            print(f"Output directory set to: {directory}")
+            log.debug("Output directory set to: %s", directory)
 
     def is_valid_youtube_url(self, url):
-        # Simple regex for YouTube URLs (can be improved)
-        youtube_regex = r"(https?://)?(www\.)?(youtube\.com/watch\?v=|youtu\.be/)([a-zA-Z0-9_-]{11})"
-        return re.match(youtube_regex, url)
+        return YOUTUBE_URL_RE.match(url) is not None
 
     def download_from_clipboard(self):
         """Fetches URL from clipboard, validates, and adds task."""
@@ -446,120 +415,131 @@ class EasyMP3App:
             messagebox.showerror("Error", "Please select an output folder first.")
             return
 
-        task_id = str(uuid.uuid4()) # Unique ID for the task
-        # Add placeholder to Treeview
+        # O(1) duplicate check instead of walking every Treeview row
+        if url.strip() in self._queued_urls:
+            messagebox.showinfo("Duplicate", "This URL is already queued or downloading.")
+            return
+        self._queued_urls.add(url.strip())
+
+        # The Treeview item id is the sole task identity
         item_id = self.task_tree.insert("", tk.END, values=(url, "-", "Queued"))
-        self.task_list[item_id] = {"url": url, "status": "Queued", "filename": "-", "real_task_id": task_id}
+        self.task_list[item_id] = Task(url)
         self.task_queue.put((item_id, url, output_path)) # Put Treeview item ID in queue
-        # print(f"Task added to queue: {item_id} - {url[:30]}...")
-
-    def update_task_display(self, item_id, column, value):
-        """Safely update the Treeview from any thread."""
+        # log.debug("Task added to queue: %s - %.30s...", item_id, url)
+
+    def _flush_updates(self):
+        """Drains the pending update dict and applies one rewrite per changed row."""
+        with self._updates_lock:
+            pending = self._pending_updates
+            self._pending_updates = {}
+            self._flush_scheduled = False
+
+        # Group the drained cells by row so each row is redrawn at most once
+        # per flush no matter how many of its cells changed
+        rows = {}
+        for (item_id, column), value in pending.items():
+            rows.setdefault(item_id, {})[column] = value
+
+        for item_id, columns in rows.items():
+            self.update_task_display(item_id, columns)
+
+    def update_task_display(self, item_id, columns):
+        """Applies a batch of column updates to one Treeview row."""
         try:
-            if self.task_tree.exists(item_id):
-                current_values = list(self.task_tree.item(item_id, 'values'))
-                # Use .get() for safer column index lookup
-                col_map = {"URL": 0, "Filename": 1, "Status": 2}
-                col_index = col_map.get(column)
-
-                if col_index is not None: # Check if column name was valid
-                    current_values[col_index] = value
-                    self.task_tree.item(item_id, values=tuple(current_values))
-
-                    # Update internal task list as well
-                    if item_id in self.task_list:
-                        internal_col_name = column.lower() # Map Treeview column name to internal dict key
-                        self.task_list[item_id][internal_col_name] = value
-
-                    # Decrement active workers ONLY if task status update indicates finished/errored
-                    # AND the update was successfully applied (i.e., no exception occurred before this)
-                    if column == "Status" and value in ["Completed", "Error: Download failed", "Error: Crop failed", "Error: Embed failed", "Error: Unexpected", "Error: File Missing", "Error: Extract failed", "Error: Embed File Missing", "Error: Crop File Missing", "Error: Unexpected Worker"]:
-                        with self.worker_lock:
-                            # Ensure worker count doesn't go below zero
-                            if self.active_workers > 0:
-                                self.active_workers -= 1
-                                # print(f"Worker finished/errored ({value}). Active workers: {self.active_workers}")
-                else:
-                    print(f"!!! Warning: Invalid column name '{column}' passed to update_task_display for item {item_id}")
+            # No tree.exists() pre-check: that is its own round-trip into the
+            # Tcl interpreter, and a vanished row already lands in the
+            # TclError handler below
+            for column, value in columns.items():
+                if column not in self._VALID_COLUMNS: # Check if column name was valid
+                    log.warning("Invalid column name %r passed to update_task_display for item %s", column, item_id)
+                    continue
+                # Write only the changed cell; Tk redraws that cell in
+                # place instead of re-rendering the entire row
+                self.task_tree.set(item_id, column, value)
+
+                # Update internal task list as well
+                task = self.task_list.get(item_id)
+                if task is not None:
+                    setattr(task, column.lower(), value) # Treeview column name -> Task attribute
+
 
         except tk.TclError as e:
             # This specifically catches errors if the item ID doesn't exist anymore when tk tries to access it
-            print(f"!!! TclError updating Treeview for {item_id} (likely item removed): {e}")
+            log.warning("TclError updating Treeview for %s (likely item removed): %s", item_id, e)
         except Exception as e:
-            print(f"!!! Error updating Treeview for {item_id}, column '{column}': {e}")
+            log.error("Error updating Treeview for %s: %s", item_id, e)
             import traceback
             traceback.print_exc() # Print full traceback for unexpected errors
 
     def clear_completed_tasks(self):
         """Removes tasks marked as 'Completed' or 'Error' from the Treeview."""
-        items_to_delete = []
-        for item_id in self.task_tree.get_children():
-            if item_id in self.task_list:
-                status = self.task_list[item_id].get("status", "")
-                if status in ["Completed", "Error"]:
-                    items_to_delete.append(item_id)
+        # Iterate the Python-side dict instead of get_children(): no Tcl
+        # round-trip per row, and finished rows are found by status prefix so
+        # the specific "Error: ..." variants are caught too
+        items_to_delete = [item_id for item_id, task in self.task_list.items()
+                           if task.status == "Completed" or task.status.startswith("Error")]
 
         if not items_to_delete:
             messagebox.showinfo("Clear Completed", "No completed or errored tasks to clear.")
             return
 
+        try:
+            # Treeview.delete takes any number of ids: one Tcl call for the lot
+            self.task_tree.delete(*items_to_delete)
+        except tk.TclError as e:
+            log.warning("TclError clearing finished tasks: %s", e)
         for item_id in items_to_delete:
-            if self.task_tree.exists(item_id):
-                self.task_tree.delete(item_id)
-            if item_id in self.task_list:
-                del self.task_list[item_id]
+            del self.task_list[item_id]
 
         messagebox.showinfo("Clear Completed", f"Removed {len(items_to_delete)} finished tasks.")
 
-    def task_manager(self):
-        """Monitors the queue and assigns tasks to worker threads."""
-        print("Task manager thread started.")
+    def _worker_loop(self):
+        """Long-lived worker thread: blocks on the queue and runs one batch at a time."""
         while True:
             try:  # Add try-except for robustness
-                # Check if we can start a new worker
-                can_start_new = False
-                with self.worker_lock:
-                    if self.active_workers < MAX_WORKERS:
-                        can_start_new = True
-
-                if can_start_new:
+                task_info = self.task_queue.get()
+                if task_info is None: # Shutdown sentinel from on_closing
+                    return
+
+                # We got a task; drain a few more so one yt-dlp process
+                # can handle the whole bunch (amortizes its startup cost)
+                batch = [task_info]
+                while len(batch) < BATCH_SIZE:
                     try:
-                        # Get a task from the queue, non-blocking
-                        task_info = self.task_queue.get_nowait()
+                        extra = self.task_queue.get_nowait()
                     except queue.Empty:
-                        # Queue is empty, wait a bit before checking again
-                        time.sleep(0.5)  # Use time.sleep, Event is overkill here
-                        continue  # Go back to the start of the loop
-
-                    # We got a task and can start it
-                    with self.worker_lock:
-                        self.active_workers += 1
-
-                    item_id, url, output_path = task_info
-
-                    print(f"Manager: Submitting task {item_id} ({url}). Active: {self.active_workers}/{MAX_WORKERS}")
-                    # Update Treeview status to "Processing..." using Capitalized "Status"
-                    schedule_gui_update(self, item_id, "Status", "Processing...") # Fixed capitalization
-
-                    # Submit the task processing function to the thread pool
-                    # Pass necessary arguments including the app instance and task_id
-                    self.executor.submit(process_task, item_id, url, output_path, self)
-                else:
-                    # Max workers reached, wait before checking again
-                    # print(f"Manager: Max workers ({self.active_workers}/{MAX_WORKERS}) reached. Waiting...")
-                    time.sleep(0.5)
-
-            except Exception as e:  # Catch errors in manager loop
-                print(f"!!! Error in Task Manager loop: {e}")
+                        break
+                    if extra is None:
+                        self.task_queue.put(None) # Leave the sentinel for a sibling
+                        break
+                    batch.append(extra)
+
+                # The output folder can change between adds — group on it
+                groups = {}
+                for item_id, url, output_path in batch:
+                    groups.setdefault(output_path, []).append((item_id, url))
+
+                for output_path, tasks in groups.items():
+                    for item_id, url in tasks:
+                        # Update Treeview status to "Processing..." using Capitalized "Status"
+                        schedule_gui_update(self, item_id, "Status", "Processing...") # Fixed capitalization
+                    process_batch(tasks, output_path, self)
+
+            except Exception as e:  # Catch errors in the worker loop
+                log.error("Error in worker loop: %s", e)
                 import traceback
                 traceback.print_exc()
                 time.sleep(5)  # Avoid busy-looping on error
 
-            # Check for application exit signal? (Handled by daemon thread + executor shutdown)
+    @property
+    def active_workers(self):
+        """Count of tasks not yet finished, derived from task state (display only)."""
+        return sum(1 for task in self.task_list.values()
+                   if task.status != "Completed" and not task.status.startswith("Error"))
 
     def on_closing(self):
-        """Handles window closing: shutdown executor and exit."""
-        print("Shutdown initiated.")
+        """Handles window closing: drain workers and exit."""
+        log.debug("Shutdown initiated.")
         close_app = True
         if self.active_workers > 0:
             # Ask for confirmation only if tasks are running
@@ -567,7 +547,7 @@ class EasyMP3App:
                 close_app = False # Don't close yet
 
         if close_app:
-            print("Proceeding with shutdown.")
+            log.debug("Proceeding with shutdown.")
             # Disable buttons to prevent adding more tasks during shutdown
             try:
                 self.clipboard_button.config(state="disabled")
@@ -576,16 +556,20 @@ class EasyMP3App:
                 pass
 
             # No blocking info message here
-            self.executor.shutdown(wait=True)  # Wait for existing tasks to complete
-            print("Executor shutdown complete.")
+            for _ in self.workers:
+                self.task_queue.put(None) # One shutdown sentinel per worker
+            for worker in self.workers:
+                worker.join()  # Wait for existing tasks to complete
+            self.crop_executor.shutdown(wait=True)  # Then for any in-flight crops
+            log.debug("Worker shutdown complete.")
             self.root.destroy()
         else:
-            print("Shutdown cancelled by user.")
+            log.debug("Shutdown cancelled by user.")
 
 if __name__ == "__main__":
     # Dependencies checked by check_dependencies() called earlier if needed
     # Recommend installing dependencies if running directly:
-    # pip install pyperclip sv_ttk
+    # pip install pyperclip sv_ttk mutagen pillow
 
     if not check_dependencies():
         sys.exit(1)  # Exit if yt-dlp/ffmpeg dependencies are missing
@@ -0,0 +1,126 @@
+import io
+import logging
+from mutagen.id3 import ID3, APIC
+from PIL import Image
+
+# Shared ID3/thumbnail helpers for the GUI (main.py) and the headless CLI
+# (cli.py). The binary tag parsing is fiddly enough that it must live in
+# exactly one place — a fix here reaches both entry points.
+
+log = logging.getLogger("easymp3.tags")
+
+def _syncsafe(b):
+    """Decodes a 4-byte syncsafe integer from an ID3v2 header."""
+    return (b[0] << 21) | (b[1] << 14) | (b[2] << 7) | b[3]
+
+def get_attached_pic(mp3_file):
+    """Returns the embedded APIC image bytes, or None if there is no usable picture."""
+    # Reading the tag directly is an order of magnitude cheaper than probing
+    # with ffmpeg/ffprobe (which isn't bundled in bin/ anyway).
+    try:
+        with open(mp3_file, 'rb') as f:
+            header = f.read(10)
+            if len(header) < 10 or not header.startswith(b'ID3'):
+                return None
+            major = header[3]
+            tag = f.read(_syncsafe(header[6:10]))
+    except OSError as e:
+        log.warning("Could not probe %s for cover art: %s", mp3_file, e)
+        return None # Skip the crop; the tag rewrite would hit the same error
+
+    # Walk the ID3v2.3/2.4 frames looking for APIC
+    pos = 0
+    while pos + 10 <= len(tag):
+        frame_id = tag[pos:pos + 4]
+        if not frame_id.strip(b'\x00'):
+            break # Hit the padding
+        frame_size = _syncsafe(tag[pos + 4:pos + 8]) if major >= 4 else int.from_bytes(tag[pos + 4:pos + 8], 'big')
+        if frame_id == b'APIC':
+            body = tag[pos + 10:pos + 10 + frame_size]
+            # encoding byte, null-terminated mime, picture type byte, then a
+            # description terminated by one null (latin-1/utf-8) or two (utf-16)
+            if not body:
+                log.warning("Malformed (empty) APIC frame in %s", mp3_file)
+                return None # Nothing decodable to crop
+            mime_end = body.find(b'\x00', 1)
+            if mime_end == -1:
+                log.warning("Malformed APIC frame in %s", mp3_file)
+                return None # Nothing decodable to crop
+            desc_start = mime_end + 2 # Skip the picture type byte
+            if body[0] in (1, 2): # utf-16 description, double-null terminated
+                desc_end = body.find(b'\x00\x00', desc_start)
+                data_start = desc_end + 2 if desc_end != -1 else desc_start
+                if data_start < len(body) and body[data_start] == 0:
+                    data_start += 1 # Keep utf-16 pairs aligned
+            else:
+                desc_end = body.find(b'\x00', desc_start)
+                data_start = desc_end + 1 if desc_end != -1 else desc_start
+            return body[data_start:]
+        pos += 10 + frame_size
+    return None
+
+def get_image_size(data):
+    """Returns (width, height) from JPEG or PNG bytes, or None if unknown."""
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return int.from_bytes(data[16:20], 'big'), int.from_bytes(data[20:24], 'big')
+    if data[:2] == b'\xff\xd8': # JPEG: scan the markers for a start-of-frame
+        pos = 2
+        while pos + 9 < len(data):
+            if data[pos] != 0xFF:
+                pos += 1
+                continue
+            marker = data[pos + 1]
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                return (int.from_bytes(data[pos + 7:pos + 9], 'big'),
+                        int.from_bytes(data[pos + 5:pos + 7], 'big'))
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                pos += 2
+            else:
+                pos += 2 + int.from_bytes(data[pos + 2:pos + 4], 'big')
+    return None
+
+def crop_thumbnail(mp3_file):
+    """Crops the embedded thumbnail to a square and patches it back in place.
+
+    GUI-free on purpose: takes only the file path and returns True on success
+    (or nothing to do) so it can run on any pool without dragging Tk state
+    along. Callers map the result to a task status or exit code."""
+    # Skip thumbnail-less files (and already-square covers, common for music
+    # uploads) before decoding anything
+    pic_data = get_attached_pic(mp3_file)
+    if pic_data is None:
+        log.debug("No thumbnail found in %s. Skipping crop.", mp3_file.name)
+        return True # Not an error, just no thumbnail to crop
+    pic_size = get_image_size(pic_data)
+    if pic_size and pic_size[0] == pic_size[1]:
+        log.debug("Thumbnail already square for %s. Skipping crop.", mp3_file.name)
+        return True # The crop would be a no-op
+
+    try:
+        # Crop in-process: one libjpeg decode, a box crop, one encode — no
+        # subprocess, no pipes, nothing touches the disk but the final tag write.
+        img = Image.open(io.BytesIO(pic_data))
+        width, height = img.size
+        side = min(width, height)
+        left = (width - side) // 2
+        top = (height - side) // 2
+        img = img.crop((left, top, left + side, top + side))
+        if img.mode != "RGB":
+            img = img.convert("RGB") # JPEG can't hold alpha/palette modes
+        cropped_buf = io.BytesIO()
+        img.save(cropped_buf, "JPEG", quality=90)
+
+        # Swap the APIC frame in place with mutagen: only the tag region at the
+        # head of the file is rewritten, not the audio stream.
+        tags = ID3(mp3_file)
+        tags.delall("APIC")
+        tags.add(APIC(encoding=3, mime="image/jpeg", type=3, desc="Cover (front)", data=cropped_buf.getvalue()))
+        tags.save(v2_version=3)
+        log.debug("Successfully processed thumbnail for: %s", mp3_file.name)
+        return True # Indicate success
+
+    except Exception as e:
+        log.error("Unexpected error processing %s: %s", mp3_file.name, e)
+        import traceback
+        traceback.print_exc() # Print full traceback for unexpected errors
+        return False # Indicate failure